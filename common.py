@@ -1,7 +1,53 @@
 """Common utilities and classes used across the Focus Stack Organizer."""
 
+from datetime import datetime
 from enum import Enum, auto
-from typing import Dict, Set
+from types import MappingProxyType
+from typing import Callable, FrozenSet, Mapping
+
+_RAW_EXTENSIONS = frozenset({
+    ".orf",  # Olympus
+    ".nef",  # Nikon
+    ".cr2",  # Canon
+    ".arw",  # Sony
+    ".rw2",  # Panasonic
+    ".raf",  # Fuji
+    ".dng"   # Adobe
+})
+
+_STANDARD_EXTENSIONS = frozenset({
+    ".jpg",
+    ".jpeg",
+    ".tiff",
+    ".tif",
+    ".png"
+})
+
+_EXTENSIONS = MappingProxyType({
+    'RAW': _RAW_EXTENSIONS,
+    'STANDARD': _STANDARD_EXTENSIONS,
+})
+
+_ALL_EXTENSIONS = _RAW_EXTENSIONS | _STANDARD_EXTENSIONS
+
+EXIF_DATE_FORMAT = '%Y:%m:%d %H:%M:%S'
+
+
+def _parse_standard_exif_date(value: str) -> datetime:
+    """Parse 'YYYY:MM:DD HH:MM:SS' by slicing, much faster than datetime.strptime."""
+    return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                    int(value[11:13]), int(value[14:16]), int(value[17:19]))
+
+
+def exif_date_parser(date_format: str = EXIF_DATE_FORMAT) -> Callable[[str], datetime]:
+    """Get a parser for EXIF date strings in the given format.
+
+    The standard EXIF format gets a slicing parser; other formats fall back to
+    datetime.strptime. Resolve the parser once and reuse it for every value.
+    """
+    if date_format == EXIF_DATE_FORMAT:
+        return _parse_standard_exif_date
+    return lambda value: datetime.strptime(value, date_format)
 
 class ImageFormat(Enum):
     """Supported image formats."""
@@ -9,33 +55,29 @@ class ImageFormat(Enum):
     STANDARD = auto()
 
     @classmethod
-    def extensions(cls) -> Dict[str, Set[str]]:
+    def extensions(cls) -> Mapping[str, FrozenSet[str]]:
         """Get supported file extensions for each format."""
-        return {
-            'RAW': {
-                ".orf",  # Olympus
-                ".nef",  # Nikon
-                ".cr2",  # Canon
-                ".arw",  # Sony
-                ".rw2",  # Panasonic
-                ".raf",  # Fuji
-                ".dng"   # Adobe
-            },
-            'STANDARD': {
-                ".jpg",
-                ".jpeg",
-                ".tiff",
-                ".tif",
-                ".png"
-            },
-        }
+        return _EXTENSIONS
 
     @classmethod
-    def all_extensions(cls) -> Set[str]:
+    def all_extensions(cls) -> FrozenSet[str]:
         """Get all supported file extensions."""
-        return {ext.lower() for exts in cls.extensions().values() for ext in exts}
+        return _ALL_EXTENSIONS
+
+    @staticmethod
+    def suffix(filename: str) -> str:
+        """Get the lower-case extension of a filename (without directory).
+
+        Follows Path.suffix: names without a dot, ending in a dot or consisting
+        only of a dot-prefixed name (e.g. '.jpg') have no extension.
+        """
+        # Direktes Slicing statt Path/os.path.splitext, wird pro Datei beim Scannen aufgerufen
+        dot = filename.rfind('.')
+        if 0 < dot < len(filename) - 1:
+            return filename[dot:].lower()
+        return ''
 
     @classmethod
     def is_supported(cls, filename: str) -> bool:
-        """Check if a filename has a supported extension."""
-        return any(filename.lower().endswith(ext) for ext in cls.all_extensions())
+        """Check if a filename (without directory) has a supported extension."""
+        return cls.suffix(filename) in _ALL_EXTENSIONS
@@ -1,11 +1,15 @@
 import json
 import os
+import pickle
+import time
+from functools import lru_cache
 from pathlib import Path
 
 class ConfigManager:
     def __init__(self):
         self.config_file = Path(__file__).parent / 'config.json'
         self.config = self._load_config()
+        self._dirty = False
 
     def _load_config(self):
         """Load configuration from file or create default if not exists."""
@@ -13,7 +17,7 @@ class ConfigManager:
             default_config = {
                 'import': {
                     'default_destination': '',
-                    'max_threads': 4,
+                    'max_threads': 0,
                     'skip_existing': True,
                     'copy_xmp_files': True,
                     'file_organization': {
@@ -26,6 +30,7 @@ class ConfigManager:
                     'min_stack_size': 2,
                     'stack_name_format': 'Stack_{:03d}',
                     'progress_update_count': 20,
+                    'use_mtime': False,
                     'exiftool': {
                         'date_format': '%Y:%m:%d %H:%M:%S',
                         'exif_tag': 'DateTimeOriginal'
@@ -37,6 +42,7 @@ class ConfigManager:
                     'jpeg_quality': 95,
                     'output_format': 'dng',
                     'helicon_path': '/Applications/HeliconFocus.app/Contents/MacOS/HeliconFocus',
+                    'max_parallel_stacks': 1,
                     'methods': {
                         'A': True,
                         'B': True,
@@ -52,9 +58,15 @@ class ConfigManager:
             return json.load(f)
 
     def _save_config(self, config):
-        """Save configuration to file."""
-        with open(self.config_file, 'w') as f:
+        """Save configuration to file.
+
+        The file is written to a temporary file first and then renamed over the
+        old one, so an interrupted write never leaves a truncated config.json.
+        """
+        tmp_file = self.config_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w') as f:
             json.dump(config, f, indent=4)
+        os.replace(tmp_file, self.config_file)
 
     def get_config(self):
         """Get the complete configuration."""
@@ -69,4 +81,89 @@ class ConfigManager:
         if 'import' not in self.config:
             self.config['import'] = {}
         self.config['import']['default_destination'] = str(Path(path).absolute())
-        self._save_config(self.config)
+        self._dirty = True
+
+    def flush(self):
+        """Write pending configuration changes to file."""
+        if self._dirty:
+            self._save_config(self.config)
+            self._dirty = False
+
+
+@lru_cache(maxsize=1)
+def get_config_manager() -> ConfigManager:
+    """Get the shared ConfigManager, loading config.json only once per process."""
+    return ConfigManager()
+
+
+class ExifCache:
+    """Persistent cache of EXIF capture times.
+
+    Entries are keyed by ``(file_name, st_size, st_mtime_ns, exif_tag, date_format)``.
+    The key follows the file when it is moved into a stack directory or copied
+    with its timestamps (import), while a file that is modified or replaced is
+    automatically read again. Each entry remembers the day it was last used;
+    entries unused for MAX_AGE_DAYS are dropped when the cache is saved, so it
+    does not keep growing with files that no longer exist.
+    """
+
+    # Bump when the key or the type of the cached values changes
+    VERSION = 4
+
+    # Einträge, die so lange nicht benutzt wurden, beim Speichern verwerfen
+    MAX_AGE_DAYS = 180
+
+    def __init__(self):
+        self.cache_file = Path(__file__).parent / 'exif_cache.pkl'
+        self.entries = self._load_cache()
+        self._today = int(time.time() // 86400)
+        self._dirty = False
+
+    def _load_cache(self):
+        """Load cached entries from file or start with an empty cache."""
+        if not self.cache_file.exists():
+            return {}
+        try:
+            with open(self.cache_file, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return {}
+        if not isinstance(data, dict) or data.get('version') != self.VERSION:
+            return {}
+        return data['entries']
+
+    @staticmethod
+    def make_key(path, stat_result, exif_tag, date_format):
+        """Build the cache key for a file from its stat result and the tag read."""
+        return (os.path.basename(path), stat_result.st_size, stat_result.st_mtime_ns,
+                exif_tag, date_format)
+
+    def get(self, key, default=None):
+        """Get a cached capture time, None for files known to have no date, else default."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return default
+        value, last_used = entry
+        # Nutzungstag nur einmal pro Tag erneuern, reine Treffer schreiben sonst nichts
+        if last_used != self._today:
+            self.entries[key] = (value, self._today)
+            self._dirty = True
+        return value
+
+    def set(self, key, value):
+        """Store a capture time in the cache (None: the file has no date)."""
+        self.entries[key] = (value, self._today)
+        self._dirty = True
+
+    def save(self):
+        """Save the cache to file if it has changed, dropping long unused entries."""
+        if not self._dirty:
+            return
+        oldest = self._today - self.MAX_AGE_DAYS
+        self.entries = {key: entry for key, entry in self.entries.items() if entry[1] >= oldest}
+        tmp_file = self.cache_file.with_suffix('.pkl.tmp')
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({'version': self.VERSION, 'entries': self.entries}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.cache_file)
+        self._dirty = False
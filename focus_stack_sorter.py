@@ -1,19 +1,35 @@
+import atexit
+import errno
 import os
-import sys
 import shutil
 import subprocess
-import time
-from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from datetime import datetime
-from enum import Enum, auto
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
-from common import ImageFormat
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from common import ImageFormat, exif_date_parser
+from config_manager import ExifCache, get_config_manager
 
 # Konstanten für die Optimierung
-BATCH_SIZE = 100  # Anzahl der Dateien pro Batch für exiftool
-MAX_WORKERS = 4   # Maximale Anzahl paralleler Threads
+BATCH_SIZE = 500  # Anzahl der Dateien pro -execute an den exiftool-Daemon
+EXIFTOOL_WORKERS = min(4, os.cpu_count() or 1)  # Parallele exiftool-Prozesse (HDDs vertragen nicht mehr)
+SCAN_WORKERS = min(8, os.cpu_count() or 1)  # Threads zum Durchsuchen vieler Unterverzeichnisse
+PARALLEL_SCAN_MIN_DIRS = 4  # Erst ab so vielen Unterverzeichnissen parallel suchen
+COPY_WORKERS = min(32, (os.cpu_count() or 1) * 4)  # Threads für Verschiebungen über Dateisystemgrenzen
+STAT_WORKERS = 16  # Threads für stat() auf Netzlaufwerken (wartet auf Latenz, nicht CPU)
+PARALLEL_STAT_MIN_FILES = 256  # Erst ab so vielen Dateien parallel stat() aufrufen
+RENAME_WORKERS = min(8, (os.cpu_count() or 1) * 2)  # Threads für Umbenennungen im selben Dateisystem
+
+DEFAULT_EXIF_CONFIG = {
+    'date_format': '%Y:%m:%d %H:%M:%S',
+    'exif_tag': 'DateTimeOriginal'
+}
+
+# Schlanke Umgebung für exiftool statt der kompletten Umgebung des Elternprozesses
+_EXIFTOOL_ENV = {key: os.environ[key] for key in
+                 ('PATH', 'HOME', 'LANG', 'LC_ALL', 'TZ', 'PERL5LIB', 'SYSTEMROOT')
+                 if key in os.environ}
 
 
 @dataclass
@@ -24,10 +40,12 @@ class SorterConfig:
         source_dir: Directory containing images to sort
         target_dir: Optional output directory. If not specified, uses source_dir.
         stack_interval: Time interval in seconds to group images. Default is 1 second.
+        use_mtime: Use the file modification time instead of the EXIF capture time.
     """
     source_dir: Path
     target_dir: Optional[Path] = None
     stack_interval: float = 1.0
+    use_mtime: bool = False
 
     def __post_init__(self):
         """Validate and process configuration after initialization."""
@@ -45,107 +63,434 @@ class SorterConfig:
             raise ValueError("Stack interval must be greater than 0 seconds")
 
 
-def process_batch(batch: List[Path], exif_config: dict) -> Dict[Path, datetime]:
-    """Process a batch of files with exiftool."""
-    try:
-        cmd = ['exiftool', f"-{exif_config['exif_tag']}", '-d', exif_config['date_format'], '-json']
-        cmd.extend(str(f) for f in batch)
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"Error running exiftool for batch: {result.stderr}")
-            return {}
-            
-        import json
-        data = json.loads(result.stdout)
+class ExifToolDaemon:
+    """Long-lived exiftool process driven over stdin (``-stay_open True -@ -``).
+
+    Starting exiftool means starting a Perl interpreter, which costs far more than
+    reading the tags of a batch of files. The daemon is started on first use and
+    every batch is sent as an argument list terminated by ``-execute``; exiftool
+    answers with the batch output followed by a ``{ready}`` line.
+    
+    Args:
+        common_args: Arguments passed once via ``-common_args`` and applied by
+            exiftool to every command.
+    """
+
+    READY = b'{ready}'
+
+    def __init__(self, common_args: Sequence[str] = ()):
+        self.common_args = list(common_args)
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> 'ExifToolDaemon':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Ask exiftool to terminate and wait for it."""
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.write(b'-stay_open\nFalse\n')
+            self.process.stdin.flush()
+        except OSError:
+            pass
+        self.process.communicate()
+        self.process = None
+
+    def start(self):
+        """Start the exiftool process unless it is already running."""
+        if self.process is not None:
+            return
+        cmd = ['exiftool', '-stay_open', 'True', '-@', '-']
+        if self.common_args:
+            cmd += ['-common_args', *self.common_args]
+        self.process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=_EXIFTOOL_ENV
+        )
+
+    def iter_lines(self, *args: str) -> Iterator[bytes]:
+        """Run one exiftool command and yield its output lines as they arrive.
         
-        times = {}
-        tag_name = exif_config['exif_tag']
-        for item in data:
-            filepath = Path(item['SourceFile'])
-            if tag_name in item:
-                try:
-                    times[filepath] = datetime.strptime(item[tag_name], exif_config['date_format'])
-                except Exception as e:
-                    print(f"Error parsing date for {filepath}: {e}")
-        return times
+        The generator must be consumed completely, otherwise the output of this
+        command would be read as the output of the next one.
+        """
+        self.start()
+        self.process.stdin.write(os.fsencode('\n'.join(args) + '\n-execute\n'))
+        self.process.stdin.flush()
         
-    except Exception as e:
-        print(f"Error processing batch: {e}")
-        return {}
+        for line in iter(self.process.stdout.readline, b''):
+            if line.rstrip() == self.READY:
+                return
+            yield line
+        # Beim nächsten Aufruf einen neuen Prozess starten
+        self.process.wait()
+        self.process = None
+        raise RuntimeError("exiftool terminated unexpectedly")
+
+    def execute(self, *args: str) -> bytes:
+        """Run one exiftool command and return its raw output."""
+        return b''.join(self.iter_lines(*args))
+
+
+def _path_key(path: str) -> str:
+    """Normalize a path string so exiftool output can be matched to its input."""
+    return os.path.normcase(os.path.normpath(path))
+
+def capture_time_args(exif_config: dict) -> List[str]:
+    """exiftool arguments that print "<path>\t<date>" for every file with the tag.
+    
+    Files without the tag are skipped by exiftool itself.
+    """
+    return ['-q', '-q', '-d', exif_config['date_format'],
+            '-p', f"$SourceFile\t${{{exif_config['exif_tag']}}}"]
+
+
+# Markiert Dateien, die nicht im EXIF-Cache stehen (None steht dort für "kein Datum")
+_UNCACHED = object()
+
+# Prozessweite Daemons pro Argumentliste, siehe shared_exiftool()
+_SHARED_DAEMONS: Dict[Tuple[str, ...], ExifToolDaemon] = {}
+
+
+def shared_exiftool(exif_config: dict) -> ExifToolDaemon:
+    """Get the process-wide exiftool daemon for reading capture times.
+    
+    The daemon is started on first use and kept running for later calls (e.g.
+    importing and then sorting in the same run); it is closed when the
+    interpreter exits.
+    
+    Args:
+        exif_config: Dictionary with exiftool configuration, see get_capture_times
+    """
+    common_args = tuple(capture_time_args(exif_config))
+    daemon = _SHARED_DAEMONS.get(common_args)
+    if daemon is None:
+        daemon = _SHARED_DAEMONS[common_args] = ExifToolDaemon(common_args)
+        atexit.register(daemon.close)
+    return daemon
+
+
+def process_batch(exiftool: ExifToolDaemon, batch: List[Path], exif_config: dict,
+                  fast_level: int = 2) -> Dict[Path, float]:
+    """Process a batch of files with an exiftool daemon started with capture_time_args.
+    
+    Capture times are returned as POSIX timestamps. fast_level selects exiftool's
+    -fastN option (0 disables it).
+    """
+    fast_args = [f'-fast{fast_level}'] if fast_level else []
+    parse_date = exif_date_parser(exif_config['date_format'])
+    
+    # exiftool gibt den Pfad ggf. anders geschrieben zurück (z.B. "/" statt "\\"
+    # unter Windows), daher auf die übergebenen Path-Objekte zurückführen
+    by_name = {_path_key(str(f)): f for f in batch}
+    
+    times = {}
+    # Serienaufnahmen teilen sich oft dieselbe Sekunde: jeden Datumsstring nur einmal parsen
+    parsed: Dict[str, float] = {}
+    for line in exiftool.iter_lines(*fast_args, *(str(f) for f in batch)):
+        filepath, _, value = os.fsdecode(line.rstrip(b'\r\n')).rpartition('\t')
+        source = by_name.get(_path_key(filepath))
+        if source is None:
+            continue
+        timestamp = parsed.get(value)
+        if timestamp is None:
+            try:
+                timestamp = parsed[value] = parse_date(value).timestamp()
+            except ValueError as e:
+                print(f"Error parsing date for {filepath}: {e}")
+                continue
+        times[source] = timestamp
+    return times
+
+def _read_capture_times(exiftool: ExifToolDaemon, filepaths: List[Path], exif_config: dict) -> Dict[Path, float]:
+    """Read capture times for a list of files batch by batch with one daemon."""
+    fast_level = exif_config.get('fast_level', 2)
+    times = {}
+    for i in range(0, len(filepaths), BATCH_SIZE):
+        batch = filepaths[i:i + BATCH_SIZE]
+        batch_times = process_batch(exiftool, batch, exif_config, fast_level)
+        if fast_level:
+            # Manche RAW-Formate speichern das Datum erst hinter dem Header:
+            # Dateien ohne Ergebnis noch einmal vollständig lesen
+            missing = [f for f in batch if f not in batch_times]
+            if missing:
+                batch_times.update(process_batch(exiftool, missing, exif_config, 0))
+        times.update(batch_times)
+    return times
 
-def get_capture_times(filepaths: List[Path], exif_config=None) -> Dict[Path, datetime]:
-    """Get capture times for multiple files using parallel batch processing.
+def get_capture_times(filepaths: List[Path], exif_config=None,
+                      exiftool: Optional[ExifToolDaemon] = None,
+                      stats: Optional[Dict[Path, os.stat_result]] = None) -> Dict[Path, float]:
+    """Get capture times for multiple files using a single exiftool daemon.
+    
+    Capture times are returned as POSIX timestamps (seconds since the epoch).
     
     Args:
         filepaths: List of files to process
         exif_config: Optional dictionary with exiftool configuration
             - date_format: Format string for date parsing
             - exif_tag: EXIF tag to read date from
+            - max_workers: Maximum number of parallel exiftool processes
+            - fast_level: exiftool -fastN level (default 2, 0 disables it)
+        exiftool: Optional daemon started with capture_time_args(exif_config) to
+            reuse. If not given, the shared daemon from shared_exiftool() is used.
+        stats: Optional stat results of the files (e.g. from os.DirEntry.stat()),
+            used for the EXIF cache keys instead of calling stat() again.
     """
     if exif_config is None:
-        from config_manager import ConfigManager
-        config = ConfigManager().get_config()
-        exif_config = config.get('sorter', {}).get('exiftool', {
-            'date_format': '%Y:%m:%d %H:%M:%S',
-            'exif_tag': 'DateTimeOriginal'
-        })
-    
-    # Teile Dateien in Batches auf
-    batches = [filepaths[i:i + BATCH_SIZE] for i in range(0, len(filepaths), BATCH_SIZE)]
+        config = get_config_manager().get_config()
+        exif_config = config.get('sorter', {}).get('exiftool', DEFAULT_EXIF_CONFIG)
     
-    # Verarbeite Batches parallel
+    # Bereits bekannte Aufnahmezeiten aus dem Cache übernehmen
+    cache = ExifCache()
+    exif_tag, date_format = exif_config['exif_tag'], exif_config['date_format']
     all_times = {}
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_batch = {executor.submit(process_batch, batch, exif_config): batch 
-                         for batch in batches}
+    uncached = []
+    for f in filepaths:
+        try:
+            st = stats[f] if stats is not None and f in stats else f.stat()
+            key = cache.make_key(f, st, exif_tag, date_format)
+        except OSError:
+            continue
+        capture_time = cache.get(key, _UNCACHED)
+        if capture_time is _UNCACHED:
+            uncached.append((f, key))
+        elif capture_time is not None:
+            all_times[f] = capture_time
+        # None: Datei hat bekanntlich kein Datum, weder -fast noch voller Lauf nötig
+    
+    # Große Mengen auf mehrere exiftool-Prozesse verteilen, kleine bleiben bei einem
+    if uncached:
+        needs_exiftool = [f for f, _ in uncached]
+        batches = -(-len(needs_exiftool) // BATCH_SIZE)
+        workers = max(1, min(exif_config.get('max_workers', EXIFTOOL_WORKERS), batches))
         
-        for future in future_to_batch:
-            try:
-                times = future.result()
-                all_times.update(times)
-            except Exception as e:
-                print(f"Error processing batch: {e}")
+        if exiftool is None:
+            exiftool = shared_exiftool(exif_config)
+        own_daemons = [ExifToolDaemon(capture_time_args(exif_config)) for _ in range(workers - 1)]
+        daemons = [exiftool] + own_daemons
+        read_ok = True
+        try:
+            if workers == 1:
+                all_times.update(_read_capture_times(daemons[0], needs_exiftool, exif_config))
+            else:
+                chunk_size = -(-len(needs_exiftool) // workers)
+                chunks = [needs_exiftool[i:i + chunk_size] for i in range(0, len(needs_exiftool), chunk_size)]
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for times in executor.map(_read_capture_times, daemons, chunks,
+                                              [exif_config] * len(chunks)):
+                        all_times.update(times)
+        except (OSError, RuntimeError) as e:
+            print(f"Error running exiftool: {e}")
+            read_ok = False
+        finally:
+            for daemon in own_daemons:
+                daemon.close()
+        
+        for f, key in uncached:
+            if f in all_times:
+                cache.set(key, all_times[f])
+            elif read_ok:
+                # Auch Dateien ohne Datum merken, solange Größe und mtime gleich bleiben
+                cache.set(key, None)
+    try:
+        cache.save()
+    except OSError as e:
+        print(f"Error saving EXIF cache: {e}")
     
     return all_times
 
-def move_files_batch(files: List[Tuple[Path, Path]], xmp_check: bool = True) -> int:
-    """Move multiple files and their XMP sidecars in parallel.
+def _scan_dir(path) -> Tuple[List[os.DirEntry], List[str]]:
+    """List one directory, returning its regular files and subdirectory paths.
+    
+    Unreadable directories (e.g. .Trashes or System Volume Information on memory
+    cards) are skipped with a warning instead of aborting the whole scan.
+    """
+    files = []
+    dirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    files.append(entry)
+    except OSError as e:
+        print(f"⚠️ Skipping unreadable directory {path}: {e.strerror or e}")
+    return files, dirs
+
+def iter_files(root: Path) -> Iterator[os.DirEntry]:
+    """Recursively yield os.DirEntry objects for all regular files below root.
+    
+    Trees with more than PARALLEL_SCAN_MIN_DIRS subdirectories are listed by a
+    thread pool, which hides per-directory latency on network filesystems. The
+    order of the yielded entries is unspecified.
+    """
+    files, pending = _scan_dir(root)
+    yield from files
+    
+    if len(pending) <= PARALLEL_SCAN_MIN_DIRS:
+        while pending:
+            files, dirs = _scan_dir(pending.pop())
+            yield from files
+            pending.extend(dirs)
+        return
+    
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        futures = {executor.submit(_scan_dir, d) for d in pending}
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, dirs = future.result()
+                yield from files
+                futures.update(executor.submit(_scan_dir, d) for d in dirs)
+
+def _stat_entries(entries: List[os.DirEntry], paths: List[Path]) -> Dict[Path, os.stat_result]:
+    """Get the stat results of scanned files, keyed by the matching path.
+    
+    Local filesystems answer stat() from the inode cache; on network shares every
+    call waits for a round trip, so larger directories are stat'ed from a thread pool.
+    Files that cannot be stat'ed (e.g. removed in the meantime) are left out.
+    """
+    def stat_entry(entry: os.DirEntry) -> Optional[os.stat_result]:
+        try:
+            return entry.stat()
+        except OSError:
+            return None
+    
+    if len(entries) >= PARALLEL_STAT_MIN_FILES:
+        with ThreadPoolExecutor(max_workers=STAT_WORKERS) as executor:
+            results = list(executor.map(stat_entry, entries))
+    else:
+        results = [stat_entry(entry) for entry in entries]
+    return {path: st for path, st in zip(paths, results) if st is not None}
+
+def _move_file(src: str, dst: str):
+    """Move a file, copying it only if src and dst are on different filesystems.
+    
+    The copy uses shutil.copyfile, which lets the kernel copy the data
+    (sendfile on Linux, fcopyfile on macOS) instead of a Python read/write loop.
+    
+    Raises:
+        FileExistsError: If dst already exists; it is never overwritten.
+    """
+    # os.rename würde unter POSIX eine gleichnamige Zieldatei still ersetzen
+    if os.path.lexists(dst):
+        raise FileExistsError(errno.EEXIST, "Target already exists", dst)
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copyfile(src, dst)
+        shutil.copystat(src, dst)
+        os.unlink(src)
+
+def move_files_batch(files: List[Tuple[Path, Path]], xmp_check: bool = True,
+                     progress_updates: int = 0) -> Dict[Path, Tuple[int, int]]:
+    """Move multiple files and their XMP sidecars.
+    
+    Moves within one filesystem are plain renames; they are grouped by target
+    directory and each group is renamed serially by one worker. Moves across
+    filesystems have to copy the data and are scheduled per file.
     
     Args:
         files: List of (source_path, target_dir) tuples
         xmp_check: Whether to check and move XMP sidecar files
+        progress_updates: Number of progress lines to print (0 disables them)
     
     Returns:
-        Number of files moved
+        Dict mapping each target_dir to (images moved, XMP sidecars moved)
     """
-    moved = 0
+    devices: Dict[Path, int] = {}
+    
+    def device(path: Path) -> int:
+        if path not in devices:
+            devices[path] = path.stat().st_dev
+        return devices[path]
     
-    def move_single(src_target: Tuple[Path, Path]) -> int:
+    def move_single(src_target: Tuple[Path, Path]) -> Tuple[int, bool]:
+        src, target = src_target
         try:
-            src, target = src_target
-            shutil.move(str(src), target)
-            count = 1
+            _move_file(str(src), str(target / src.name))
+            xmp_moved = False
             
             if xmp_check:
                 xmp_path = src.with_suffix('.xmp')
-                if xmp_path.exists():
-                    shutil.move(str(xmp_path), target)
-                    count += 1
-            return count
+                try:
+                    _move_file(str(xmp_path), str(target / xmp_path.name))
+                    xmp_moved = True
+                except FileNotFoundError:
+                    pass
+                except FileExistsError as e:
+                    print(f"Not moving {xmp_path}: {e.filename} already exists")
+            return 1, xmp_moved
         except Exception as e:
             print(f"Error moving {src}: {e}")
-            return 0
-    
-    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        for count in executor.map(move_single, files):
-            moved += count
+            return 0, False
     
-    return moved
+    # Gleiches Dateisystem: rename() ist ein einzelner Syscall, daher wird pro
+    # Zielverzeichnis nur ein Task eingeplant, der alle Dateien nacheinander umbenennt
+    renames: Dict[Path, List[Path]] = {}
+    copies = []
+    for src, target in files:
+        try:
+            same_fs = device(src.parent) == device(target)
+        except OSError:
+            same_fs = False
+        if same_fs:
+            renames.setdefault(target, []).append(src)
+        else:
+            copies.append((src, target))
+    
+    def rename_group(target: Path, sources: List[Path]) -> Tuple[int, int]:
+        results = [move_single((src, target)) for src in sources]
+        return sum(images for images, _ in results), sum(xmp for _, xmp in results)
+    
+    moved_counts: Dict[Path, Tuple[int, int]] = {}
+    total = len(files)
+    # Fortschritt nur ausgeben, wenn die nächste Schwelle erreicht ist
+    step = max(1, total // progress_updates) if progress_updates > 0 else total + 1
+    done = 0
+    next_tick = step
+    
+    def record(target: Path, result: Tuple[int, int]):
+        nonlocal done, next_tick
+        images, xmps = moved_counts.get(target, (0, 0))
+        moved_counts[target] = (images + result[0], xmps + result[1])
+        done += result[0]
+        if done >= next_tick:
+            print(f"\r📊 Progress: {done / total:.1%} ({done}/{total})", end="")
+            while next_tick <= done:
+                next_tick += step
+    
+    # Ein einzelnes Zielverzeichnis braucht keinen Thread-Pool
+    if not copies and len(renames) <= 1:
+        for target, sources in renames.items():
+            record(target, rename_group(target, sources))
+        return moved_counts
+    
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS if copies else RENAME_WORKERS) as executor:
+        futures = [(target, executor.submit(rename_group, target, sources))
+                   for target, sources in renames.items()]
+        futures.extend((target, executor.submit(move_single, (src, target)))
+                       for src, target in copies)
+        for target, future in futures:
+            record(target, future.result())
+    
+    return moved_counts
 
 
 
-def stack_images(source_dir: Path, target_dir: Optional[Path] = None, stack_interval: Optional[float] = None) -> List[Path]:
+def stack_images(source_dir: Path, target_dir: Optional[Path] = None, stack_interval: Optional[float] = None,
+                 use_mtime: Optional[bool] = None) -> List[Path]:
     """Sort images into focus stacks based on capture time intervals.
     
     This function analyzes a directory for supported image files and groups them into
@@ -156,6 +501,9 @@ def stack_images(source_dir: Path, target_dir: Optional[Path] = None, stack_inte
         source_dir: Directory containing images to sort
         target_dir: Optional output directory. If not specified, uses source_dir.
         stack_interval: Time interval in seconds to group images. Default is 1 second.
+        use_mtime: Group by file modification time instead of the EXIF capture
+            time. This skips exiftool entirely but is only correct if the files
+            still carry the camera's timestamps. Default comes from config.json.
         
     Returns:
         List[Path]: Created stack directories. Each directory contains the image
@@ -163,52 +511,55 @@ def stack_images(source_dir: Path, target_dir: Optional[Path] = None, stack_inte
         sequential number.
     """
     # Load configuration
-    from config_manager import ConfigManager
-    config = ConfigManager().get_config()
+    config = get_config_manager().get_config()
     
     # Initialize configuration
     sorter_config = config.get('sorter', {})
     min_stack_size = sorter_config.get('min_stack_size', 2)
     stack_name_format = sorter_config.get('stack_name_format', 'Stack_{:03d}')
-    progress_update_count = sorter_config.get('progress_updates', 20)
+    progress_update_count = sorter_config.get('progress_update_count', 20)
+    exif_config = sorter_config.get('exiftool', DEFAULT_EXIF_CONFIG)
     
     if stack_interval is None:
         stack_interval = sorter_config.get('stack_interval', 1.0)
+    if use_mtime is None:
+        use_mtime = sorter_config.get('use_mtime', False)
     
     # Create target directory if not exists
     target_path = Path(target_dir) if target_dir else source_dir
     target_path.mkdir(parents=True, exist_ok=True)
     
     # Get all supported image formats
-    all_extensions = set()
-    for extensions in ImageFormat.extensions().values():
-        all_extensions.update(extensions)
+    all_extensions = ImageFormat.all_extensions()
     
     # Find all image files
     print("\n🔍 Finding image files...")
     image_files = []
-    xmp_files = []
-    format_counts = {}
-    total_images = 0
+    xmp_count = 0
+    format_counts = Counter()
+    stats: Dict[Path, os.stat_result] = {}
     
-    for f in source_dir.rglob('*'):
-        if not f.is_file():
-            continue
-            
-        ext = f.suffix.lower()
+    image_entries = []
+    for entry in iter_files(source_dir):
+        ext = ImageFormat.suffix(entry.name)
         if ext == '.xmp':
-            xmp_files.append(f)
+            xmp_count += 1
         elif ext in all_extensions:
-            image_files.append(f)
-            format_counts[ext] = format_counts.get(ext, 0) + 1
-            total_images += 1
+            image_entries.append(entry)
+            image_files.append(Path(entry.path))
+            format_counts[ext] += 1
+    # Einmal pro Datei: dient dem EXIF-Cache bzw. als Aufnahmezeit (use_mtime)
+    stats = _stat_entries(image_entries, image_files)
+    # Nach Namen sortieren: bei gleicher Aufnahmezeit bleibt die Reihenfolge stabil
+    image_files.sort()
+    total_images = len(image_files)
     
     # Group files by categories
     found_categories = {}
     for category, extensions in ImageFormat.extensions().items():
         category_files = []
         for ext in extensions:
-            count = format_counts.get(ext.lower(), 0)
+            count = format_counts[ext]
             if count > 0:
                 category_files.append(f"  - {count}x {ext}")
         if category_files:
@@ -222,16 +573,20 @@ def stack_images(source_dir: Path, target_dir: Optional[Path] = None, stack_inte
                 print(line)
     
     # Zeige XMP-Dateien an, falls vorhanden
-    if xmp_files:
+    if xmp_count:
         print(f"\nSidecar files:")
-        print(f"  - {len(xmp_files)}x .xmp")
+        print(f"  - {xmp_count}x .xmp")
     
     if total_images > 0:
         print(f"\n✅ Total: {total_images} image files")
     
-    # Get capture times for all files at once (bereits optimiert durch Batching)
-    print("📅 Reading EXIF data in batch mode...")
-    capture_times = get_capture_times(image_files)
+    if use_mtime:
+        print("📅 Using file modification times (EXIF skipped)...")
+        capture_times = {path: st.st_mtime for path, st in stats.items()}
+    else:
+        # Get capture times for all files at once (bereits optimiert durch Batching)
+        print("📅 Reading EXIF data in batch mode...")
+        capture_times = get_capture_times(image_files, exif_config, stats=stats)
     
     # Filter files with EXIF data
     image_files = [f for f in image_files if f in capture_times]
@@ -242,44 +597,51 @@ def stack_images(source_dir: Path, target_dir: Optional[Path] = None, stack_inte
         print("❌ No usable files found!")
         return []
 
-    # Sortiere Dateien nach Aufnahmezeit
-    sorted_files = sorted(image_files, key=lambda f: capture_times[f])
-    
-    # Identifiziere Stacks basierend auf Zeitintervallen
-    stacks = []
-    current_stack = []
-    last_time = None
-    
-    for file in sorted_files:
-        capture_time = capture_times[file]
-        if last_time and (capture_time - last_time).total_seconds() > stack_interval:
-            if len(current_stack) >= min_stack_size:
-                stacks.append(current_stack)
-            current_stack = []
-        current_stack.append(file)
-        last_time = capture_time
-    
-    # Letzten Stack hinzufügen, wenn groß genug
-    if len(current_stack) >= min_stack_size:
-        stacks.append(current_stack)
-    
-    # Erstelle Stack-Verzeichnisse parallel
-    created_stacks = []
+    # Sortiere Dateien nach Aufnahmezeit (bei Gleichstand nach Pfad) und
+    # behalte die Zeitstempel als eigene Liste für die Grenzsuche
+    ordered = sorted((capture_times[f], f) for f in image_files)
+    sorted_files = [f for _, f in ordered]
+    times = [t for t, _ in ordered]
+    
+    # Identifiziere Stack-Grenzen in einem Durchlauf über die Zeitstempel
+    boundaries = [i for i, (previous, current) in enumerate(zip(times, times[1:]), 1)
+                  if current - previous > stack_interval]
+    
+    # Stacks als (Start, Ende)-Indizes in sorted_files, nur wenn groß genug
+    starts = [0] + boundaries
+    ends = boundaries + [len(sorted_files)]
+    stacks = [(start, end) for start, end in zip(starts, ends) if end - start >= min_stack_size]
+    
+    # Alle Stack-Verzeichnisse sind jetzt bekannt: vor dem Verschieben anlegen.
+    # Pfade als Strings bauen, für das Standardformat ohne str.format()
+    target_base = str(target_path)
+    if stack_name_format == 'Stack_{:03d}':
+        stack_dir_names = [f"{target_base}{os.sep}Stack_{stack_num:03d}"
+                           for stack_num in range(1, len(stacks) + 1)]
+    else:
+        stack_dir_names = [os.path.join(target_base, stack_name_format.format(stack_num))
+                           for stack_num in range(1, len(stacks) + 1)]
+    for stack_dir in stack_dir_names:
+        try:
+            os.mkdir(stack_dir)  # target_path existiert bereits
+        except FileExistsError:
+            pass
+    created_stacks = [Path(stack_dir) for stack_dir in stack_dir_names]
+    
+    # Sammle alle Dateien zum Verschieben
     files_to_move = []
     stack_sizes = []
-    
-    for stack_num, stack_files in enumerate(stacks, 1):
-        stack_dir = target_path / stack_name_format.format(stack_num)
-        stack_dir.mkdir(parents=True, exist_ok=True)
-        created_stacks.append(stack_dir)
-        stack_sizes.append((stack_num, len(stack_files)))
-        
-        # Sammle alle Dateien zum Verschieben
-        files_to_move.extend([(f, stack_dir) for f in stack_files])
+    for stack_dir, (start, end) in zip(created_stacks, stacks):
+        stack_sizes.append((stack_dir, end - start))
+        files_to_move.extend((f, stack_dir) for f in sorted_files[start:end])
     
     # Verschiebe Dateien parallel
     print("\n📦 Moving files in parallel...")
-    files_moved = move_files_batch(files_to_move)
+    moved_counts = move_files_batch(files_to_move, progress_updates=progress_update_count)
+    files_moved = sum(images + xmps for images, xmps in moved_counts.values())
+    # XMP-Anzahl pro Stack stammt aus dem Verschiebeschritt, kein erneutes glob()
+    stack_sizes = [(stack_dir, size, moved_counts.get(stack_dir, (0, 0))[1])
+                   for stack_dir, size in stack_sizes]
 
     print("\r" + " " * 80 + "\r", end="")  # Clear the last progress indicator
     print(f"✅ Done: {len(created_stacks)} stacks created in {target_path.resolve()}")
@@ -287,11 +649,9 @@ def stack_images(source_dir: Path, target_dir: Optional[Path] = None, stack_inte
     # Print stack overview
     if stack_sizes:
         print("\n📂 Stack overview:")
-        for stack_num, size in stack_sizes:
-            stack_dir = target_path / stack_name_format.format(stack_num)
-            xmp_count = len(list(stack_dir.glob("*.xmp")))
+        for stack_dir, size, xmp_count in stack_sizes:
             xmp_info = f" (+{xmp_count} xmp)" if xmp_count > 0 else ""
-            print(f"Stack_{stack_num:03d} → {size} images{xmp_info}")
+            print(f"{stack_dir.name} → {size} images{xmp_info}")
         print(f"\n📁 {files_moved} files moved.")
         print(f"📁 Target directory: {target_path.resolve()}")
     else:
@@ -2,14 +2,20 @@
 HeliconFocus integration module for focus stacking.
 """
 
+import asyncio
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
-import subprocess
+import os
+import struct
+import sys
+import tempfile
 import time
-from typing import List, Optional, Dict, Any
+from typing import IO, List, Optional, Dict, Any, Set, Tuple
 
-from config_manager import ConfigManager
+from common import ImageFormat
+from config_manager import get_config_manager
 
 
 class InterpolationMethod(Enum):
@@ -40,6 +46,12 @@ class Method(Enum):
     C = 2  # Combination of A and B
 
 
+@lru_cache(maxsize=8)
+def _helicon_exists(helicon_path: str) -> bool:
+    """Check once per path whether the HeliconFocus executable exists."""
+    return Path(helicon_path).exists()
+
+
 @dataclass
 class HeliconConfig:
     """HeliconFocus configuration parameters.
@@ -83,31 +95,10 @@ class HeliconConfig:
         return [Method[name] for name, enabled in self.methods.items()
                 if enabled and name in ('A', 'B', 'C')]
     
-    def __post_init__(self):
-        """Initialize default values and validate configuration."""
-        if self.methods is None:
-            self.methods = {
-                'A': True,
-                'B': True,
-                'C': False,
-                'AB': True
-            }
-        
-        if not 1 <= self.radius <= 8:
-            raise ValueError("Radius must be between 1 and 8")
-        if not 0 <= self.smoothing <= 4:
-            raise ValueError("Smoothing must be between 0 and 4")
-        if not 1 <= self.jpeg_quality <= 100:
-            raise ValueError("JPEG quality must be between 1 and 100")
-        if self.output_format not in ["jpg", "tif", "dng"]:
-            raise ValueError("Output format must be 'jpg', 'tif', or 'dng'")
-        if not Path(self.helicon_path).exists():
-            raise FileNotFoundError(f"HeliconFocus not found at {self.helicon_path}")
-    
     @classmethod
     def from_config(cls) -> 'HeliconConfig':
         """Create HeliconConfig from config.json settings."""
-        config = ConfigManager().get_config()
+        config = get_config_manager().get_config()
         helicon_config = config.get('helicon_focus', {})
         
         # Get interpolation method from config
@@ -134,7 +125,15 @@ class HeliconConfig:
         )
     
     def __post_init__(self):
-        """Validate configuration parameters."""
+        """Initialize default values and validate configuration parameters."""
+        if self.methods is None:
+            self.methods = {
+                'A': True,
+                'B': True,
+                'C': False,
+                'AB': True
+            }
+        
         if not 1 <= self.radius <= 8:
             raise ValueError("Radius must be between 1 and 8")
         if not 0 <= self.smoothing <= 4:
@@ -143,7 +142,7 @@ class HeliconConfig:
             raise ValueError("JPEG quality must be between 1 and 100")
         if self.output_format not in ["jpg", "tif", "dng"]:
             raise ValueError("Output format must be 'jpg', 'tif', or 'dng'")
-        if not Path(self.helicon_path).exists():
+        if not _helicon_exists(self.helicon_path):
             raise FileNotFoundError(f"HeliconFocus not found at {self.helicon_path}")
         if not 0 <= self.vertical_adjustment <= 100:
             raise ValueError("Vertical adjustment must be between 0 and 100")
@@ -157,44 +156,157 @@ class HeliconConfig:
             raise ValueError("Brightness adjustment must be between 0 and 100")
 
 
-def create_input_file(stack_dir: Path, supported_extensions: List[str]) -> Optional[Path]:
-    """Create input file listing all images to process.
+@lru_cache(maxsize=1)
+def default_config() -> HeliconConfig:
+    """Return the HeliconConfig from config.json, created and validated only once."""
+    return HeliconConfig.from_config()
+
+
+# Unterstützte Endungen (klein geschrieben) als Tupel für str.endswith(), einmal beim Import
+_SUPPORTED_SUFFIXES = tuple(sorted(ImageFormat.all_extensions()))
+
+# fcntl-Kommando für Readahead unter macOS (sys/fcntl.h), fehlt im fcntl-Modul
+_F_RDADVISE = 44
+
+
+def prefetch_files(paths: List[str]) -> None:
+    """Ask the kernel to start reading the given files into the page cache.
+    
+    HeliconFocus opens the images only after its own start-up; prefetching lets
+    the reads overlap with it. Errors are ignored, prefetching is only a hint.
+    
+    Args:
+        paths: Files that will be read soon
+    """
+    if hasattr(os, 'posix_fadvise'):
+        def advise(fd: int) -> None:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    elif sys.platform == 'darwin':
+        import fcntl
+        
+        def advise(fd: int) -> None:
+            # struct radvisory { off_t ra_offset; int ra_count; }
+            size = min(os.fstat(fd).st_size, 0x7FFFFFFF)
+            fcntl.fcntl(fd, _F_RDADVISE, struct.pack('qi4x', 0, size))
+    else:
+        return
+    
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            advise(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def prefetch_stack(stack_dir: Path) -> None:
+    """Prefetch all images of a stack directory, e.g. while the previous stack runs.
+    
+    Args:
+        stack_dir: Directory containing the stack images
+    """
+    try:
+        with os.scandir(stack_dir) as entries:
+            paths = [entry.path for entry in entries
+                     if entry.name.lower().endswith(_SUPPORTED_SUFFIXES) and entry.is_file()]
+    except OSError:
+        return
+    prefetch_files(paths)
+
+
+def temporary_list_file(directory: Path, prefix: str) -> IO[bytes]:
+    """Create an unbuffered temporary list file that is deleted when closed."""
+    return tempfile.NamedTemporaryFile('wb', buffering=0, dir=directory, prefix=prefix, suffix='.txt')
+
+
+def write_list_file(file: IO[bytes], lines: List[str]) -> None:
+    """Write one path per line with a single write() on an unbuffered file.
+    
+    Args:
+        file: Unbuffered binary file, e.g. from temporary_list_file()
+        lines: Lines to write, without line endings
+    """
+    data = b'\n'.join(os.fsencode(line) for line in lines) + b'\n'
+    view = memoryview(data)
+    while view:
+        view = view[file.write(view):]
+
+
+def create_input_file(stack_dir: Path,
+                      supported_extensions: Optional[List[str]] = None,
+                      prefetch: bool = True) -> Optional[IO[bytes]]:
+    """Create a temporary input file listing all images to process.
     
     Args:
         stack_dir: Directory containing the image files
-        supported_extensions: List of supported file extensions (e.g., ['.orf', '.RAF'])
+        supported_extensions: List of supported file extensions (e.g., ['.orf', '.RAF']).
+            Defaults to all formats known to ImageFormat; matching ignores case.
+        prefetch: Whether to prefetch the listed images. Pass False if the caller
+            already did (e.g. with prefetch_stack).
     
     Returns:
-        Path to created input file or None if no images found
+        Open input file (removed when closed; pass its name to HeliconFocus) or None
+        if no images found
     """
-    input_file = stack_dir / "input.txt"
+    # Dateien direkt auflisten statt über eine Shell mit ls und sed;
+    # endswith() mit einem Tupel vermeidet ein Path-Objekt pro Eintrag
+    if supported_extensions is None:
+        suffixes = _SUPPORTED_SUFFIXES
+    else:
+        suffixes = tuple(ext.lower() for ext in supported_extensions)
+    with os.scandir(stack_dir.absolute()) as entries:
+        paths = sorted(entry.path for entry in entries
+                       if entry.name.lower().endswith(suffixes) and entry.is_file())
+    if not paths:
+        print(f"⚠️ No supported image files found in {stack_dir}")
+        return None
     
-    # Build pattern for supported formats
-    patterns = [f"*.{ext[1:]}" for ext in supported_extensions]
-    patterns.extend([f"*.{ext[1:].upper()}" for ext in supported_extensions])
-    format_pattern = ' '.join(patterns)
+    # Bilder schon in den Page Cache laden lassen, während HeliconFocus startet
+    if prefetch:
+        prefetch_files(paths)
     
     try:
-        cmd = f"cd {stack_dir.absolute()} && (ls {format_pattern} 2>/dev/null || true) | "\
-              f"sed 's|^|{stack_dir.absolute()}/|' > {input_file.absolute()}"
-        subprocess.run(cmd, shell=True, check=True)
-        
-        # Check if any files were found
-        if input_file.stat().st_size == 0:
-            print(f"⚠️ No supported image files found in {stack_dir}")
-            return None
+        input_file = temporary_list_file(stack_dir, 'input_')
+    except OSError as e:
+        print(f"❌ Failed to create input file: {e}")
+        return None
+    try:
+        write_list_file(input_file, paths)
         return input_file
-    except subprocess.CalledProcessError as e:
+    except OSError as e:
+        input_file.close()
         print(f"❌ Failed to create input file: {e}")
         return None
 
 
 def run_helicon_focus(cmd: List[str], description: str) -> bool:
-    """Run HeliconFocus with given command.
+    """Run HeliconFocus with given command, blocking until it has finished.
+    
+    Thin wrapper around run_helicon_focus_async for callers without an event loop.
+    
+    Args:
+        cmd: Command line arguments for HeliconFocus
+        description: Description of the operation for logging
+    
+    Returns:
+        True if successful, False otherwise
+    """
+    return asyncio.run(run_helicon_focus_async(cmd, description))
+
+
+async def run_helicon_focus_async(cmd: List[str], description: str,
+                                  cpus: Optional[Set[int]] = None) -> bool:
+    """Run HeliconFocus with given command without blocking the event loop.
     
     Args:
         cmd: Command line arguments for HeliconFocus
         description: Description of the operation for logging
+        cpus: Optional CPUs to pin the HeliconFocus process to (Linux only)
     
     Returns:
         True if successful, False otherwise
@@ -202,64 +314,163 @@ def run_helicon_focus(cmd: List[str], description: str) -> bool:
     print(f"\n📦 {description}...")
     start_time = time.time()
     
+    # Affinität im Kindprozess vor exec setzen, damit auch alle Threads, die
+    # HeliconFocus beim Start anlegt, nur die zugeteilten CPUs nutzen
+    preexec_fn = None
+    if cpus:
+        def preexec_fn() -> None:
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError:
+                pass  # CPUs nicht erlaubt, dann ohne Pinning starten
+    
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            elapsed = time.time() - start_time
-            print(f"✅ Completed successfully in {elapsed:.2f} seconds")
-            return True
-        else:
-            print(f"❌ Error: {result.stderr}")
-            return False
+        process = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            preexec_fn=preexec_fn)
+        _, stderr = await process.communicate()
     except Exception as e:
         print(f"❌ Failed to run HeliconFocus: {e}")
         return False
+    
+    if process.returncode == 0:
+        elapsed = time.time() - start_time
+        print(f"✅ Completed successfully in {elapsed:.2f} seconds")
+        return True
+    print(f"❌ Error: {stderr.decode(errors='replace')}")
+    return False
+
+
+def _split_cpus(count: int) -> List[Set[int]]:
+    """Split the CPUs available to this process into count disjoint sets.
+    
+    Parallel HeliconFocus processes each get their own CPUs so the scheduler does
+    not migrate them between cores. CPUs that do not divide evenly are handed out
+    round-robin, so every CPU belongs to one set. Returns an empty list if pinning
+    is not supported (e.g. macOS) or there are fewer CPUs than processes.
+    """
+    if count < 2 or not hasattr(os, 'sched_getaffinity'):
+        return []
+    cpus = sorted(os.sched_getaffinity(0))
+    per_set, extra = divmod(len(cpus), count)
+    if per_set == 0:
+        return []
+    sets = []
+    start = 0
+    for i in range(count):
+        end = start + per_set + (1 if i < extra else 0)
+        sets.append(set(cpus[start:end]))
+        start = end
+    return sets
+
+
+class CpuSlots:
+    """Slots for concurrently running HeliconFocus processes, each with its own CPUs.
+    
+    One instance is shared by all stacks of a batch, so processes of different
+    stacks never get the same CPUs. The number of slots also limits how many
+    HeliconFocus processes run at the same time. Must be created inside the
+    event loop that uses it.
+    """
+    
+    def __init__(self, count: int):
+        count = max(1, count)
+        self._free: asyncio.Queue = asyncio.Queue()
+        for cpus in _split_cpus(count) or [None] * count:
+            self._free.put_nowait(cpus)
+    
+    async def run(self, cmd: List[str], description: str) -> bool:
+        """Wait for a free slot and run HeliconFocus pinned to its CPUs."""
+        cpus = await self._free.get()
+        try:
+            return await run_helicon_focus_async(cmd, description, cpus)
+        finally:
+            self._free.put_nowait(cpus)
+
+
+async def run_helicon_jobs(jobs: List[Tuple[List[str], str]], limit: int,
+                           cpu_slots: Optional[CpuSlots] = None) -> List[bool]:
+    """Run several HeliconFocus commands concurrently.
+    
+    Args:
+        jobs: (command, description) pairs
+        limit: Maximum number of HeliconFocus processes running at the same time
+            (ignored if cpu_slots is given)
+        cpu_slots: Slots shared with other stacks of the same batch
+    
+    Returns:
+        Success flag per job, in the order of jobs
+    """
+    if cpu_slots is None:
+        cpu_slots = CpuSlots(min(limit, len(jobs)))
+    return await asyncio.gather(*(cpu_slots.run(cmd, description) for cmd, description in jobs))
 
 
 def process_stack(
     stack_dir: Path,
     output_dir: Path,
-    config: Optional[HeliconConfig] = None
+    config: Optional[HeliconConfig] = None,
+    existing_outputs: Optional[Set[str]] = None,
+    prefetch: bool = True
+) -> List[Path]:
+    """Process a stack with Helicon Focus using methods A, B, C.
+    
+    Blocking wrapper around process_stack_async, see there for details.
+    
+    Returns:
+        List[Path]: List of output files generated by HeliconFocus.
+    """
+    return asyncio.run(process_stack_async(stack_dir, output_dir, config, existing_outputs,
+                                           prefetch=prefetch))
+
+
+async def process_stack_async(
+    stack_dir: Path,
+    output_dir: Path,
+    config: Optional[HeliconConfig] = None,
+    existing_outputs: Optional[Set[str]] = None,
+    cpu_slots: Optional[CpuSlots] = None,
+    prefetch: bool = True
 ) -> List[Path]:
     """Process a stack with Helicon Focus using methods A, B, C.
     
     This function processes a stack of images using different HeliconFocus methods.
-    It checks for existing results and only processes missing methods. If combine_ab
-    is True, it will also create an A+B combination using method B.
+    It checks for existing results and only processes missing methods. If the 'AB'
+    method is enabled, it will also create an A+B combination using method B.
     
     Args:
         stack_dir (Path): Directory containing stack images
         output_dir (Path): Directory for output images
-        radius (int, optional): Radius parameter for HeliconFocus. Defaults to 3.
-        smoothing (int, optional): Smoothing parameter for HeliconFocus. Defaults to 1.
-        jpeg_quality (int, optional): JPEG quality (1-100). Defaults to 95.
-        output_format (str, optional): Output format (jpg, tif or dng). Defaults to 'dng'.
-        helicon_path (str, optional): Path to HeliconFocus executable.
-        combine_ab (bool, optional): Whether to combine methods A and B. Defaults to True.
+        config (HeliconConfig, optional): HeliconFocus configuration. If None, uses
+            config.json settings.
+        existing_outputs (Set[str], optional): Names of the files already in output_dir,
+            e.g. from one directory scan shared by several stacks. If None, each
+            output file is checked individually.
+        cpu_slots (CpuSlots, optional): CPU slots shared by all stacks of a batch.
+            If None, the stack's methods split the CPUs among themselves.
+        prefetch (bool): Prefetch the stack images before starting HeliconFocus.
+            False if the caller has already prefetched them.
     
     Returns:
         List[Path]: List of output files generated by HeliconFocus.
-    
-    Note:
-        The function creates a HeliconConfig object internally to manage configuration
-        parameters. It uses the Method enum to handle different stacking methods.
     """
     print(f"\n💾 Starting HeliconFocus for {stack_dir.name}")
     
     # Create output directory if it doesn't exist
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Import ImageFormat here to avoid circular imports
-    from focus_stack_sorter import ImageFormat
-    
-    # Create input file with source images
-    input_file = create_input_file(stack_dir, ImageFormat.all_extensions())
-    if not input_file:
-        return []
+    def output_exists(path: Path) -> bool:
+        if existing_outputs is not None:
+            return path.name in existing_outputs
+        return path.exists()
     
     # Use provided config or load from config.json
     if config is None:
-        config = HeliconConfig.from_config()
+        config = default_config()
+    
+    # Ausgabepfade aller Methoden einmal pro Stack bilden
+    stem = str(output_dir / stack_dir.name)
+    out = {name: Path(f"{stem}_{name}.{config.output_format}") for name in ('A', 'B', 'C', 'AB')}
     
     # Determine which methods to process
     method_map = {
@@ -283,103 +494,173 @@ def process_stack(
             continue
             
         method = method_map[method_name]
-        output_file = output_dir / f"{stack_dir.name}_{method.name}.{config.output_format}"
+        output_file = out[method.name]
         
-        if output_file.exists():
+        if output_exists(output_file):
             existing_methods.append(method)
             results.append(output_file)
         else:
             missing_methods.append(method)
     
+    # Alles schon vorhanden (z.B. fortgesetzter Batch): keine Eingabedatei, kein Aufruf
+    use_a, use_b, use_ab = (config.methods.get(name, False) for name in ('A', 'B', 'AB'))
+    ab_exists = use_ab and output_exists(out['AB'])
+    if not missing_methods and (not use_ab or ab_exists):
+        print(f"\n💡 All results for {stack_dir.name} already exist")
+        if ab_exists:
+            results.append(out['AB'])
+        return results
+    
     if existing_methods:
         print(f"\n💡 Found existing results for methods: {', '.join(m.name for m in existing_methods)}")
         print(f"🔄 Will generate missing methods: {', '.join(m.name for m in missing_methods)}")
     
-    # Process missing methods
-    for method in missing_methods:
-        output_file = output_dir / f"{stack_dir.name}_{method.name}.{config.output_format}"
-        
-        # Create command line for HeliconFocus
-        cmd = [
-            config.helicon_path,
-            '-silent',
-            '-i', str(input_file),
-            f'-save:{output_file}',
-            f'-mp:{method.value}',  # Method parameter (A=0, B=1, C=2)
-            f'-rp:{config.radius}',  # Radius parameter
-            f'-sp:{config.smoothing}',  # Smoothing parameter
-            f'-va:{config.vertical_adjustment}',  # Vertical adjustment
-            f'-ha:{config.horizontal_adjustment}',  # Horizontal adjustment
-            f'-ra:{config.rotation_adjustment}',  # Rotation adjustment
-            f'-ma:{config.magnification_adjustment}',  # Magnification adjustment
-            f'-ba:{config.brightness_adjustment}',  # Brightness adjustment
-            f'-im:{config.interpolation_method.value}'  # Interpolation method
-        ]
-        
-        # Add JPEG quality only for JPG output
-        if config.output_format.lower() == 'jpg':
-            cmd.append(f'-j:{config.jpeg_quality}')
+    # Parameter, die für alle Methoden dieses Stacks gleich sind, nur einmal formatieren
+    parameters = [
+        f'-rp:{config.radius}',  # Radius parameter
+        f'-sp:{config.smoothing}',  # Smoothing parameter
+        f'-va:{config.vertical_adjustment}',  # Vertical adjustment
+        f'-ha:{config.horizontal_adjustment}',  # Horizontal adjustment
+        f'-ra:{config.rotation_adjustment}',  # Rotation adjustment
+        f'-ma:{config.magnification_adjustment}',  # Magnification adjustment
+        f'-ba:{config.brightness_adjustment}',  # Brightness adjustment
+        f'-im:{config.interpolation_method.value}'  # Interpolation method
+    ]
+    
+    # Add JPEG quality only for JPG output
+    if config.output_format.lower() == 'jpg':
+        parameters.append(f'-j:{config.jpeg_quality}')
+    
+    # Process missing methods. Jeder Aufruf ist ein eigener HeliconFocus-Prozess
+    # auf derselben Eingabedatei, daher laufen sie parallel.
+    if missing_methods:
+        # Create input file with source images (wird beim Schließen gelöscht)
+        # Im Executor, damit Auflisten und Prefetch die anderen Stacks nicht blockieren
+        loop = asyncio.get_running_loop()
+        input_file = await loop.run_in_executor(None, create_input_file, stack_dir, None, prefetch)
+        if not input_file:
+            return []
         
-        if run_helicon_focus(cmd, f"Processing {stack_dir.name} with Method {method.name}"):
-            results.append(output_file)
+        with input_file:
+            input_args = [config.helicon_path, '-silent', '-i', input_file.name]
+            jobs = []
+            for method in missing_methods:
+                output_file = out[method.name]
+                
+                # Create command line for HeliconFocus
+                cmd = input_args + [
+                    f'-save:{output_file}',
+                    f'-mp:{method.value}',  # Method parameter (A=0, B=1, C=2)
+                ] + parameters
+                
+                jobs.append((cmd, f"Processing {stack_dir.name} with Method {method.name}", output_file))
+            
+            workers = min(len(jobs), os.cpu_count() or 1)
+            # Erst wenn alle Methoden fertig sind, wird A+B kombiniert
+            succeeded = await run_helicon_jobs([(cmd, description) for cmd, description, _ in jobs],
+                                               workers, cpu_slots)
+        results.extend(output_file for (_, _, output_file), ok in zip(jobs, succeeded) if ok)
     
     # Process A+B combination if enabled
-    if config.methods.get('AB', False):
-        ab_file = output_dir / f"{stack_dir.name}_AB.{config.output_format}"
-        if ab_file.exists():
+    if use_ab:
+        ab_file = out['AB']
+        if ab_exists:
             print("\n💡 A+B combination already exists")
             results.append(ab_file)
             return results
         
         # Check if both A and B methods are enabled and available
-        all_methods = existing_methods + missing_methods
-        if Method.A in all_methods and Method.B in all_methods and \
-           config.methods.get('A', False) and config.methods.get('B', False):
+        available = set(existing_methods) | set(missing_methods)
+        if use_a and use_b and Method.A in available and Method.B in available:
             
             # Create input file for A+B combination
-            a_file = output_dir / f"{stack_dir.name}_A.{config.output_format}"
-            b_file = output_dir / f"{stack_dir.name}_B.{config.output_format}"
-            ab_input = stack_dir / "input_ab.txt"
+            a_file = out['A']
+            b_file = out['B']
             
-            try:
-                with open(ab_input, 'w') as f:
-                    f.write(f"{a_file.absolute()}\n{b_file.absolute()}\n")
+            with temporary_list_file(stack_dir, 'input_ab_') as ab_input:
+                write_list_file(ab_input, [str(a_file.absolute()), str(b_file.absolute())])
                 
                 # Create command line for HeliconFocus
                 cmd = [
                     config.helicon_path,
                     '-silent',
-                    '-i', str(ab_input),
+                    '-i', ab_input.name,
                     f'-save:{ab_file}',
                     '-mp:1',  # Method B for combination
-                    f'-rp:{config.radius}',  # Radius parameter
-                    f'-sp:{config.smoothing}',  # Smoothing parameter
-                    f'-va:{config.vertical_adjustment}',  # Vertical adjustment
-                    f'-ha:{config.horizontal_adjustment}',  # Horizontal adjustment
-                    f'-ra:{config.rotation_adjustment}',  # Rotation adjustment
-                    f'-ma:{config.magnification_adjustment}',  # Magnification adjustment
-                    f'-ba:{config.brightness_adjustment}',  # Brightness adjustment
-                    f'-im:{config.interpolation_method.value}'  # Interpolation method
-                ]
-                
-                # Add JPEG quality only for JPG output
-                if config.output_format.lower() == 'jpg':
-                    cmd.append(f'-j:{config.jpeg_quality}')
+                ] + parameters
                 
-                if run_helicon_focus(cmd, "Combining methods A and B"):
+                combined = await run_helicon_jobs([(cmd, "Combining methods A and B")], 1, cpu_slots)
+                if combined[0]:
                     results.append(ab_file)
-            finally:
-                # Clean up AB input file
-                try:
-                    if ab_input.exists():
-                        ab_input.unlink()
-                except Exception:
-                    pass
-    
-    # Clean up original input file
-    try:
-        input_file.unlink()
-    except Exception:
-        pass
     
     return results
+
+
+def process_stacks(
+    stack_dirs: List[Path],
+    output_dir: Optional[Path] = None,
+    config: Optional[HeliconConfig] = None,
+    workers: Optional[int] = None
+) -> List[List[Path]]:
+    """Process several stacks with Helicon Focus in parallel.
+    
+    Args:
+        stack_dirs: Directories containing stack images
+        output_dir: Directory for all output images. If None, each stack writes
+            to a 'stacked' subdirectory of its own directory.
+        config: Optional HeliconFocus configuration. If None, uses config.json settings.
+        workers: Number of stacks processed at the same time.
+            Defaults to half the number of CPUs.
+    
+    Returns:
+        List[List[Path]]: Output files per stack, in the order of stack_dirs.
+    """
+    return asyncio.run(process_stacks_async(stack_dirs, output_dir, config, workers))
+
+
+async def process_stacks_async(
+    stack_dirs: List[Path],
+    output_dir: Optional[Path] = None,
+    config: Optional[HeliconConfig] = None,
+    workers: Optional[int] = None
+) -> List[List[Path]]:
+    """Process several stacks with Helicon Focus in one event loop.
+    
+    Arguments and return value as for process_stacks.
+    """
+    # Konfiguration einmal erstellen (und validieren) statt einmal pro Stack
+    if config is None:
+        config = default_config()
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // 2)
+    
+    # Gemeinsames Ausgabeverzeichnis einmal einlesen statt pro Stack und Methode zu prüfen
+    existing_outputs = None
+    if output_dir is not None:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        with os.scandir(output_dir) as entries:
+            existing_outputs = {entry.name for entry in entries}
+    
+    # HeliconFocus läuft als eigener Prozess; die Event-Loop wartet auf alle
+    # gleichzeitig, das Semaphor begrenzt die Zahl der Stacks in Arbeit
+    workers = max(1, workers)
+    semaphore = asyncio.Semaphore(workers)
+    
+    # CPUs einmal für den ganzen Batch aufteilen: so viele Slots wie Prozesse
+    # gleichzeitig laufen können (Stacks mal Methoden pro Stack)
+    methods = sum(1 for name in ('A', 'B', 'C') if config.methods.get(name, False)) or 1
+    cpu_slots = CpuSlots(workers * min(methods, os.cpu_count() or 1))
+    total = len(stack_dirs)
+    completed = 0
+    
+    async def process_one(stack_dir: Path) -> List[Path]:
+        nonlocal completed
+        stack_dir = Path(stack_dir)
+        target = Path(output_dir) if output_dir is not None else stack_dir / "stacked"
+        async with semaphore:
+            results = await process_stack_async(stack_dir, target, config, existing_outputs, cpu_slots)
+        completed += 1
+        print(f"📊 Progress: {completed}/{total} stacks completed")
+        return results
+    
+    return await asyncio.gather(*(process_one(stack_dir) for stack_dir in stack_dirs))
@@ -1,48 +1,34 @@
+import errno
 import os
-import json
 import shutil
-import subprocess
+import stat
+import sys
+import time
 from concurrent import futures
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Set, Tuple
 from common import ImageFormat
-from config_manager import ConfigManager
+from config_manager import get_config_manager
+from focus_stack_sorter import get_capture_times, iter_files
 
-def get_image_dates(image_paths: List[Path]) -> Dict[Path, datetime]:
-    """Extract dates from multiple images in one exiftool call."""
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+def get_image_dates(image_paths: List[Path],
+                    stats: Optional[Dict[Path, os.stat_result]] = None) -> Dict[Path, datetime]:
+    """Extract capture dates for multiple images.
+
+    Uses the same batched exiftool reader (and EXIF cache) as the stack sorter.
+    stats optionally holds already known stat results for the EXIF cache keys.
+    """
     if not image_paths:
         return {}
-
-    try:
-        # Use exiftool to read EXIF data for all files at once
-        cmd = ['exiftool', '-DateTimeOriginal', '-d', '%Y:%m:%d %H:%M:%S', '-json'] + [str(f) for f in image_paths]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        
-        # Parse JSON output
-        data = json.loads(result.stdout)
-        
-        # Create dictionary of filepath -> capture time
-        dates = {}
-        for item in data:
-            filepath = Path(item['SourceFile'])
-            if 'DateTimeOriginal' in item:
-                try:
-                    dates[filepath] = datetime.strptime(item['DateTimeOriginal'], "%Y:%m:%d %H:%M:%S")
-                except ValueError as e:
-                    print(f"Error parsing date for {filepath}: {e}")
-        
-        return dates
-        
-    except subprocess.CalledProcessError as e:
-        print(f"Error running exiftool: {e}")
-    except Exception as e:
-        print(f"Error processing EXIF data: {e}")
-    
-    return {}
     
-    # If no EXIF data or error, use file modification time
-    return datetime.fromtimestamp(os.path.getmtime(image_path))
+    capture_times = get_capture_times(image_paths, stats=stats)
+    return {path: datetime.fromtimestamp(timestamp) for path, timestamp in capture_times.items()}
 
 def check_directory_access(path, is_source=True):
     """
@@ -57,22 +43,29 @@ def check_directory_access(path, is_source=True):
     """
     try:
         path = Path(path)
-        if not path.exists():
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
             if is_source:
                 return False, set(), f"Source directory does not exist: {path}"
             # For destination, we'll try to create it
             try:
                 path.mkdir(parents=True, exist_ok=True)
+                st = os.stat(path)
             except Exception as e:
                 return False, set(), f"Could not create destination directory {path}: {e}"
         
-        # Check if we can read/write
-        if is_source:
-            if not os.access(path, os.R_OK):
-                return False, set(), f"Cannot read from source directory: {path}"
+        # Check if we can read/write. Als Eigentümer reichen die Modusbits aus dem
+        # stat-Ergebnis, sonst (Gruppe, ACLs, root) entscheidet os.access
+        euid = os.geteuid() if hasattr(os, 'geteuid') else None
+        if euid and st.st_uid == euid:
+            allowed = bool(st.st_mode & (stat.S_IRUSR if is_source else stat.S_IWUSR))
         else:
-            if not os.access(path, os.W_OK):
-                return False, set(), f"Cannot write to destination directory: {path}"
+            allowed = os.access(path, os.R_OK if is_source else os.W_OK)
+        if not allowed:
+            if is_source:
+                return False, set(), f"Cannot read from source directory: {path}"
+            return False, set(), f"Cannot write to destination directory: {path}"
                 
         return True, created_dirs, ""
     except Exception as e:
@@ -80,30 +73,92 @@ def check_directory_access(path, is_source=True):
 
 created_dirs: Set[Path] = set()
 
-def copy_file_with_date(args):
-    """Copy a single file to its date-based destination."""
-    image_path, date, destination_path, config = args
+# Fortschritt höchstens so oft ausgeben (Sekunden)
+PROGRESS_INTERVAL = 0.1
+
+# Kopieren wartet fast nur auf I/O (SD-Karte, Netzlaufwerk), daher mehr Threads als CPUs
+COPY_WORKERS = min(32, (os.cpu_count() or 4) * 4)
+
+# Fehler, bei denen copy_file_range nicht nutzbar ist (z.B. anderes Dateisystem,
+# alter Kernel) und auf shutil.copy2 zurückgefallen wird
+_COPY_FALLBACK_ERRNOS = frozenset({errno.EXDEV, errno.ENOSYS, errno.EINVAL,
+                                   errno.EOPNOTSUPP, errno.EBADF, errno.ETXTBSY})
+
+# ioctl FICLONE (Linux): Ziel teilt die Blöcke der Quelle (btrfs, XFS), kein Datentransfer
+_FICLONE = 0x40049409
+
+# Fehler, bei denen kein Reflink möglich ist (anderes Dateisystem, kein CoW-Support)
+_REFLINK_FALLBACK_ERRNOS = frozenset({errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTTY,
+                                      errno.EINVAL, errno.ENOSYS, errno.EBADF})
+
+def _try_reflink(fsrc, fdst) -> bool:
+    """Clone the source file into the destination via FICLONE.
+
+    Args:
+        fsrc: Open source file
+        fdst: Open (empty) destination file
+
+    Returns:
+        bool: True if the destination now shares the source's data blocks
+    """
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return False
     try:
-        # Create year and date directories
-        year_dir = destination_path / str(date.year)
-        date_dir = year_dir / date.strftime(config['import']['file_organization']['date_format'])
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        return True
+    except OSError as e:
+        if e.errno not in _REFLINK_FALLBACK_ERRNOS:
+            raise
+        return False
 
-        year_dir.mkdir(exist_ok=True)
-        date_dir.mkdir(exist_ok=True)
-        created_dirs.add(date_dir)
+def fast_copy(src, dst):
+    """Copy a file with its metadata, letting the kernel move the data if possible.
+    
+    On copy-on-write filesystems (btrfs, XFS) the destination is first created as
+    a reflink via FICLONE, which costs a single syscall regardless of file size.
+    Otherwise uses os.copy_file_range (Linux), which copies inside the kernel.
+    Falls back to shutil.copy2 (sendfile or fcopyfile)
+    where neither is available or supported.
+    """
+    if os.name == 'posix' and hasattr(os, 'copy_file_range'):
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                if _try_reflink(fsrc, fdst):
+                    remaining = 0
+                else:
+                    remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            shutil.copystat(src, dst)
+            return
+        except OSError as e:
+            if e.errno not in _COPY_FALLBACK_ERRNOS:
+                raise
+    shutil.copy2(src, dst)
 
-        # Copy file to destination
-        dest_file = date_dir / image_path.name
-        if dest_file.exists() and config['import']['skip_existing']:
-            return 'skipped', image_path
+def copy_file_with_date(image_path: str, dest_file: str, xmp_path: Optional[str] = None):
+    """Copy a single file to its date-based destination.
+
+    The destination directory must already exist and existing files are not
+    checked here; import_images creates all date directories and filters out
+    existing files before copying. Paths are plain strings, this runs once per file.
 
-        shutil.copy2(image_path, dest_file)
+    Args:
+        image_path: Image to copy
+        dest_file: Destination file path
+        xmp_path: XMP sidecar file to copy along with the image, if any. The copy
+            is always named with a lower-case '.xmp', as the sorter expects.
+    """
+    try:
+        # Copy file to destination
+        fast_copy(image_path, dest_file)
 
-        # Copy XMP file if enabled and exists
-        if config['import']['copy_xmp_files']:
-            xmp_path = image_path.with_suffix('.xmp')
-            if xmp_path.exists():
-                shutil.copy2(xmp_path, date_dir / xmp_path.name)
+        # Sidecar direkt danach kopieren, solange das Quellverzeichnis noch im Cache ist
+        if xmp_path:
+            fast_copy(xmp_path, os.path.splitext(dest_file)[0] + '.xmp')
 
         return 'success', image_path
 
@@ -120,10 +175,10 @@ def import_images(source_path: str, destination_path: Optional[str] = None) -> T
                          uses the default_destination from config.
 
     Returns:
-        bool: True if import was successful, False otherwise
+        Tuple[bool, Set[Path]]: (success, created date directories)
     """
     # Load configuration
-    config = ConfigManager().get_config()
+    config = get_config_manager().get_config()
     
     # Convert paths to Path objects
     source_path = Path(source_path)
@@ -144,57 +199,120 @@ def import_images(source_path: str, destination_path: Optional[str] = None) -> T
 
     # Find all image files
     print("🔍 Scanning for images...")
+    # scandir liefert Name und Dateityp ohne zusätzliche stat()-Aufrufe;
+    # stat() der DirEntry wird für die Cache-Schlüssel weiterverwendet
     image_files = []
-    for root, _, files in os.walk(source_path):
-        for file in files:
-            if ImageFormat.is_supported(file):
-                image_files.append(Path(root) / file)
+    image_stats = {}
+    # XMP-Sidecars gleich mit erfassen, dann entfällt beim Kopieren ein exists() pro Bild
+    # Schlüssel: Pfad ohne Endung, klein geschrieben (IMG_0001.XMP von FAT/exFAT-Karten)
+    xmp_files: Dict[str, str] = {}
+    all_extensions = ImageFormat.all_extensions()
+    for entry in iter_files(source_path):
+        ext = ImageFormat.suffix(entry.name)
+        if ext == '.xmp':
+            xmp_files[os.path.splitext(entry.path)[0].lower()] = entry.path
+        elif ext in all_extensions:
+            path = Path(entry.path)
+            image_files.append(path)
+            try:
+                image_stats[path] = entry.stat()
+            except OSError:
+                pass
 
     if not image_files:
         print("❌ No supported image files found.")
-        return False
+        return False, set()
 
     print(f"✅ Found {len(image_files)} image files")
 
     # Get dates for all images in batch
     print("📅 Reading image dates...")
-    image_dates = get_image_dates(image_files)
+    image_dates = get_image_dates(image_files, image_stats)
     
     if not image_dates:
         print("❌ Could not extract dates from any images")
-        return False
+        return False, set()
 
-    # Prepare copy operations
-    copy_operations = [
-        (img, date, destination_path)
-        for img, date in image_dates.items()
-    ]
+    # Prepare copy operations. Die Zielverzeichnisse stehen mit den Aufnahmedaten
+    # fest und werden einmal im Hauptthread angelegt statt pro Datei in den Threads
+    date_format = config['import']['file_organization']['date_format']
+    skip_existing = config['import']['skip_existing']
+    copy_xmp = config['import']['copy_xmp_files']
+    copy_operations = []
+    # Pro Zielverzeichnis die vorhandenen Dateinamen (ein scandir statt stat pro Datei),
+    # None wenn das Verzeichnis nicht angelegt werden konnte
+    dir_names: Dict[str, Optional[Set[str]]] = {}
+    # Serienaufnahmen teilen sich die Aufnahmesekunde: Verzeichnis nur einmal formatieren
+    date_dirs: Dict[datetime, str] = {}
+    destination_str = str(destination_path)
+    success_count = error_count = skipped_count = 0
+    for img, date in image_dates.items():
+        date_dir = date_dirs.get(date)
+        if date_dir is None:
+            date_dir = date_dirs[date] = os.path.join(
+                destination_str, str(date.year), date.strftime(date_format))
+        if date_dir not in dir_names:
+            try:
+                os.makedirs(date_dir, exist_ok=True)
+                created_dirs.add(Path(date_dir))
+                names = set()
+                if skip_existing:
+                    with os.scandir(date_dir) as entries:
+                        names = {entry.name for entry in entries}
+                dir_names[date_dir] = names
+            except OSError as e:
+                print(f"Error creating directory {date_dir}: {e}")
+                dir_names[date_dir] = None
+        names = dir_names[date_dir]
+        if names is None:
+            error_count += 1
+        elif skip_existing and img.name in names:
+            skipped_count += 1
+        else:
+            # Bei skip_existing auch gleichnamige Dateien aus anderen Quellordnern überspringen
+            names.add(img.name)
+            src = str(img)
+            xmp_path = xmp_files.get(os.path.splitext(src)[0].lower()) if copy_xmp else None
+            copy_operations.append((src, os.path.join(date_dir, img.name), xmp_path))
 
     # Process files in parallel
-    success_count = error_count = skipped_count = 0
     total = len(copy_operations)
 
     print("💾 Copying files...")
-    with futures.ThreadPoolExecutor(max_workers=config['import']['max_threads']) as executor:
-        future_to_file = {executor.submit(copy_file_with_date, args + (config,)): args[0]
-                         for args in copy_operations}
+    max_threads = config['import'].get('max_threads') or COPY_WORKERS
+    with futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
+        # Nur ein begrenztes Fenster an Futures offen halten statt eines pro Datei
+        operations = iter(copy_operations)
+        window = max_threads * 2
+        pending = {executor.submit(copy_file_with_date, *operation)
+                   for _, operation in zip(range(window), operations)}
 
         completed = 0
-        for future in futures.as_completed(future_to_file):
-            completed += 1
-            status, file = future.result()
-            
-            # Update counts
-            if status == 'success':
-                success_count += 1
-            elif status == 'skipped':
-                skipped_count += 1
-            else:
-                error_count += 1
-
-            # Show progress
-            progress = (completed / total) * 100
-            print(f"\r📊 Progress: {progress:.1f}% ({completed}/{total})", end="")
+        next_update = 0.0
+        while pending:
+            done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                completed += 1
+                status, file = future.result()
+                
+                # Update counts
+                if status == 'success':
+                    success_count += 1
+                elif status == 'skipped':
+                    skipped_count += 1
+                else:
+                    error_count += 1
+
+            # Freie Plätze im Fenster nachfüllen
+            pending.update(executor.submit(copy_file_with_date, *operation)
+                           for _, operation in zip(range(len(done)), operations))
+
+            # Show progress, gedrosselt statt nach jeder Datei
+            now = time.monotonic()
+            if now >= next_update or completed == total:
+                next_update = now + PROGRESS_INTERVAL
+                sys.stdout.write(f"\r📊 Progress: {completed / total:.1%} ({completed}/{total})")
+                sys.stdout.flush()
 
     # Print summary
     print("\n\n📊 Import Summary:")
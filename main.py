@@ -9,17 +9,31 @@ import os
 import sys
 import time
 import argparse
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Set, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 
-from focus_stack_sorter import stack_images, ImageFormat
-from helicon_focus import process_stack
-from image_importer import import_images
-from config_manager import ConfigManager
+from config_manager import get_config_manager
 
+# Die Arbeitsmodule (und damit asyncio, subprocess, ...) werden erst in den Befehlen
+# importiert, die sie brauchen; "config" oder "--help" starten so deutlich schneller
+if TYPE_CHECKING:
+    from helicon_focus import HeliconConfig
 
-def import_only(source_dir: str, destination_dir: Optional[str] = None) -> Tuple[bool, Set[Path]]:
+
+class ImportResult(NamedTuple):
+    """Result of an import: success flag and the created date directories."""
+    success: bool
+    created_dirs: Set[Path]
+
+
+class SortResult(NamedTuple):
+    """Result of an import and sort run: success flag and the created stacks."""
+    success: bool
+    stacks: List[Path]
+
+
+def import_only(source_dir: str, destination_dir: Optional[str] = None) -> ImportResult:
     """Import images from source to destination.
     
     Args:
@@ -27,13 +41,47 @@ def import_only(source_dir: str, destination_dir: Optional[str] = None) -> Tuple
         destination_dir: Optional destination directory
     
     Returns:
-        Tuple[bool, Set[Path]]: (success, created_directories)
+        ImportResult: (success, created_dirs)
     """
+    from image_importer import import_images
+    
     print("\n📥 Importing images...")
-    return import_images(source_dir, destination_dir)
+    return ImportResult(*import_images(source_dir, destination_dir))
+
+
+def newest_directory(directories: Set[Path]) -> Path:
+    """Return the most recently modified directory.
+    
+    Args:
+        directories: Non-empty set of directories
+    
+    Returns:
+        Path: Directory with the newest modification time
+    """
+    # Meist wurde nur ein Tagesordner angelegt, dann ist kein stat() nötig
+    if len(directories) == 1:
+        return next(iter(directories))
+    
+    # Je Elternverzeichnis (Jahr) ein scandir statt eines Path.stat() pro Ordner;
+    # DirEntry speichert die stat-Daten (unter Windows schon aus dem Verzeichnislisting)
+    by_parent: Dict[Path, Set[str]] = {}
+    for directory in directories:
+        by_parent.setdefault(directory.parent, set()).add(directory.name)
+    newest, newest_mtime = None, -1
+    for parent, names in by_parent.items():
+        try:
+            with os.scandir(parent) as entries:
+                for entry in entries:
+                    if entry.name in names:
+                        mtime = entry.stat(follow_symlinks=False).st_mtime_ns
+                        if mtime > newest_mtime:
+                            newest, newest_mtime = Path(entry.path), mtime
+        except OSError:
+            continue
+    return newest if newest is not None else next(iter(directories))
 
 
-def import_and_sort(source_dir: str, destination_dir: Optional[str] = None) -> Tuple[bool, List[Path]]:
+def import_and_sort(source_dir: str, destination_dir: Optional[str] = None) -> SortResult:
     """Import images and sort them into stacks.
     
     Args:
@@ -41,46 +89,55 @@ def import_and_sort(source_dir: str, destination_dir: Optional[str] = None) -> T
         destination_dir: Optional destination directory
     
     Returns:
-        Tuple[bool, List[Path]]: (success, created_stacks)
+        SortResult: (success, stacks)
     """
+    from focus_stack_sorter import stack_images
+    
     print("\n🔄 Starting import and sort workflow")
     
     # 1. Import images
-    success, created_dirs = import_only(source_dir, destination_dir)
-    if not success:
-        return False, []
+    imported = import_only(source_dir, destination_dir)
+    if not imported.success:
+        return SortResult(False, [])
     
-    if not created_dirs:
+    if not imported.created_dirs:
         print("❌ No directories were created during import")
-        return False, []
+        return SortResult(False, [])
     
     # 2. Sort into stacks
-    target_dir = max(created_dirs, key=lambda d: d.stat().st_mtime)
+    target_dir = newest_directory(imported.created_dirs)
     print(f"\n📂 Found target directory: {target_dir}")
     print("\n🔍 Sorting into stacks...")
     
     stacks = stack_images(target_dir)
-    return bool(stacks), stacks
+    return SortResult(bool(stacks), stacks)
 
 
-def sort_only(directory: str) -> List[Path]:
+def sort_only(directory: str, use_mtime: Optional[bool] = None) -> List[Path]:
     """Sort images in a directory into stacks.
     
     Args:
         directory: Directory containing images to sort
+        use_mtime: Group by file modification time instead of EXIF data.
+            None uses the setting from config.json.
     
     Returns:
         List[Path]: Created stack directories
     """
+    from focus_stack_sorter import stack_images
+    
     print("\n🔍 Sorting images into stacks...")
-    return stack_images(Path(directory))
+    return stack_images(Path(directory), use_mtime=use_mtime)
 
 
-def stack_only(directory: str) -> bool:
+def stack_only(directory: str, config: Optional['HeliconConfig'] = None,
+               prefetch: bool = True) -> bool:
     """Process a directory with Helicon Focus.
     
     Args:
         directory: Directory containing images to stack
+        config: Optional HeliconFocus configuration. If None, uses config.json settings.
+        prefetch: Prefetch the images first; False if the caller already did.
     
     Returns:
         bool: True if successful
@@ -92,15 +149,60 @@ def stack_only(directory: str) -> bool:
         
     print("\n🔄 Processing with Helicon Focus...")
     output_dir = target_dir / "stacked"
-    results = process_with_helicon(target_dir, output_dir)
+    results = process_with_helicon(target_dir, output_dir, config, prefetch)
     return bool(results)
 
 
-def sort_and_stack(directory: str) -> bool:
+def stack_all(stacks: List[Path]) -> None:
+    """Process several stack directories with Helicon Focus.
+    
+    Up to max_parallel_stacks stacks (config.json) run at the same time. When
+    they run one after another, the images of the next stack are already read
+    into the page cache in the background while Helicon Focus works on one stack.
+    
+    Args:
+        stacks: Stack directories to process
+    """
+    from helicon_focus import default_config, prefetch_stack, process_stacks
+    
+    total_stacks = len(stacks)
+    if not total_stacks:
+        return
+    config = get_config_manager().get_config()
+    workers = min(config.get('helicon_focus', {}).get('max_parallel_stacks', 1) or 1, total_stacks)
+    # HeliconFocus-Konfiguration einmal für alle Stacks erstellen und durchreichen
+    helicon_config = default_config()
+    
+    if workers > 1:
+        # Die Stacks sind unabhängig; eine Event-Loop wartet auf alle HeliconFocus-Prozesse
+        print(f"\n🔄 Processing {total_stacks} stacks, up to {workers} at a time...")
+        results = process_stacks(stacks, config=helicon_config, workers=workers)
+        for stack_dir, outputs in zip(stacks, results):
+            if not outputs:
+                print(f"❌ Failed to process stack {stack_dir.name}")
+        return
+    
+    with ThreadPoolExecutor(max_workers=1) as io_pool:
+        prefetch = io_pool.submit(prefetch_stack, stacks[0])
+        for idx, stack_dir in enumerate(stacks, 1):
+            # Auf das Vorladen dieses Stacks warten, dann schon den nächsten anstoßen
+            prefetch.result()
+            if idx < total_stacks:
+                prefetch = io_pool.submit(prefetch_stack, stacks[idx])
+            print(f"\n📂 Processing stack: {stack_dir.name} ({idx}/{total_stacks})")
+            if not stack_only(str(stack_dir), helicon_config, prefetch=False):
+                print(f"❌ Failed to process stack {stack_dir.name}")
+                continue
+            if idx < total_stacks:
+                print(f"📊 Progress: {idx}/{total_stacks} stacks completed")
+
+
+def sort_and_stack(directory: str, use_mtime: Optional[bool] = None) -> bool:
     """Sort images into stacks and process with Helicon Focus.
     
     Args:
         directory: Directory containing images to process
+        use_mtime: Group by file modification time instead of EXIF data
     
     Returns:
         bool: True if successful
@@ -108,20 +210,13 @@ def sort_and_stack(directory: str) -> bool:
     print("\n🔄 Starting sort and stack workflow")
     
     # 1. Sort into stacks
-    stacks = sort_only(directory)
+    stacks = sort_only(directory, use_mtime)
     if not stacks:
         print("❌ No stacks created")
         return False
     
     # 2. Process with Helicon Focus
-    total_stacks = len(stacks)
-    for idx, stack_dir in enumerate(stacks, 1):
-        print(f"\n📂 Processing stack: {stack_dir.name} ({idx}/{total_stacks})")
-        if not stack_only(str(stack_dir)):
-            print(f"❌ Failed to process stack {stack_dir.name}")
-            continue
-        if idx < total_stacks:
-            print(f"📊 Progress: {idx}/{total_stacks} stacks completed")
+    stack_all(stacks)
     
     return True
 
@@ -139,62 +234,79 @@ def auto_process(source_dir: str, destination_dir: Optional[str] = None) -> bool
     print("\n🔄 Starting automatic processing workflow")
     
     # 1. Import and sort
-    success, stacks = import_and_sort(source_dir, destination_dir)
-    if not success:
+    result = import_and_sort(source_dir, destination_dir)
+    if not result.success:
         return False
     
     # 2. Process with Helicon Focus
     print("\n🔄 Processing stacks with Helicon Focus...")
-    total_stacks = len(stacks)
-    for idx, stack_dir in enumerate(stacks, 1):
-        print(f"\n📂 Processing stack: {stack_dir.name} ({idx}/{total_stacks})")
-        if not stack_only(str(stack_dir)):
-            print(f"❌ Failed to process stack {stack_dir.name}")
-            continue
-        if idx < total_stacks:
-            print(f"📊 Progress: {idx}/{total_stacks} stacks completed")
+    stack_all(result.stacks)
     
     print("\n✅ Automatic processing complete!")
     return True
 
 
-from helicon_focus import HeliconConfig, process_stack
-
-
 def add_helicon_args(parser: argparse.ArgumentParser) -> None:
     """Add Helicon Focus arguments to a parser."""
     # No arguments needed as configuration is handled via config.json
     pass
 
 
-def get_helicon_config(args: argparse.Namespace) -> HeliconConfig:
+def get_helicon_config(args: argparse.Namespace) -> 'HeliconConfig':
     """Create HeliconConfig from config.json."""
+    from helicon_focus import HeliconConfig
     return HeliconConfig.from_config()
 
 
-def process_with_helicon(stack_dir: Path, output_dir: Path, config: Optional[HeliconConfig] = None) -> List[Path]:
+def process_with_helicon(stack_dir: Path, output_dir: Path, config: Optional['HeliconConfig'] = None,
+                         prefetch: bool = True) -> List[Path]:
     """Process a stack with Helicon Focus.
     
     Args:
         stack_dir: Directory containing images to stack
         output_dir: Directory for output files
         config: Optional HeliconFocus configuration. If None, uses config.json settings.
+        prefetch: Prefetch the stack images; False if the caller already did.
         
     Returns:
         List[Path]: Paths to created output files
     """
-    # Ensure directories exist
-    stack_dir = Path(stack_dir)
-    output_dir = Path(output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    from helicon_focus import process_stack
     
+    # process_stack legt output_dir selbst an, hier kein zweites mkdir pro Stack
     return process_stack(
-        stack_dir=stack_dir,
-        output_dir=output_dir,
-        config=config
+        stack_dir=Path(stack_dir),
+        output_dir=Path(output_dir),
+        config=config,
+        prefetch=prefetch
     )
 
-    return results or []
+
+def _result(success: bool, success_message: str, failure_message: str) -> Tuple[bool, str]:
+    """Pair a command's success flag with the message to print."""
+    return success, success_message if success else failure_message
+
+
+def _stacks_result(stacks: List[Path], failure_message: str) -> Tuple[bool, str]:
+    """Result of a command that creates stacks."""
+    return _result(bool(stacks), f"Successfully created {len(stacks)} stacks", failure_message)
+
+
+# Befehl -> Funktion, die (Erfolg, Meldung) liefert; "config" wird in main() behandelt
+COMMANDS: Dict[str, Callable[[argparse.Namespace], Tuple[bool, str]]] = {
+    "import": lambda args: _result(import_only(args.source, args.destination).success,
+                                   "Import completed successfully", "Import failed"),
+    "import-sort": lambda args: _stacks_result(import_and_sort(args.source, args.destination).stacks,
+                                               "Import and sort failed"),
+    "sort": lambda args: _stacks_result(sort_only(args.directory, args.use_mtime), "No stacks created"),
+    "stack": lambda args: _result(stack_only(args.directory),
+                                  "Stack processed successfully", "Stack processing failed"),
+    "sort-stack": lambda args: _result(sort_and_stack(args.directory, args.use_mtime),
+                                       "Sort and stack completed successfully", "Sort and stack failed"),
+    "auto": lambda args: _result(auto_process(args.source, args.destination),
+                                 "Automatic processing completed successfully", "Automatic processing failed"),
+}
+
 
 def main() -> None:
     """
@@ -203,7 +315,8 @@ This script provides a command-line interface to control both the focus stack so
 and Helicon Focus functionality independently.
 """
     """Main entry point for the Focus Stack Organizer."""
-    total_start = time.time()
+    # Monotone Uhr: unabhängig von NTP-/Zeitumstellungen während langer Läufe
+    total_start = time.perf_counter_ns()
     
     parser = argparse.ArgumentParser(description="Focus Stack Organizer Control Center")
     subparsers = parser.add_subparsers(dest="command", help="Commands")
@@ -221,6 +334,8 @@ and Helicon Focus functionality independently.
     # Sort command
     sort_parser = subparsers.add_parser('sort', help='Sort images in a directory into stacks')
     sort_parser.add_argument('directory', help='Directory containing images')
+    sort_parser.add_argument('--use-mtime', action='store_true', default=None,
+                             help='Use file modification times instead of EXIF capture times')
 
     # Stack command
     stack_parser = subparsers.add_parser('stack', help='Process a directory with Helicon Focus')
@@ -229,6 +344,8 @@ and Helicon Focus functionality independently.
     # Sort and stack command
     sort_stack_parser = subparsers.add_parser('sort-stack', help='Sort images into stacks and process with Helicon Focus')
     sort_stack_parser.add_argument('directory', help='Directory containing images')
+    sort_stack_parser.add_argument('--use-mtime', action='store_true', default=None,
+                                   help='Use file modification times instead of EXIF capture times')
 
     # Auto process command
     auto_parser = subparsers.add_parser('auto', help='Import, sort, and stack images in one go')
@@ -242,69 +359,19 @@ and Helicon Focus functionality independently.
     
     args = parser.parse_args()
     
-    if args.command == "import":
-        success, _ = import_only(args.source, args.destination)
-        if success:
-            print("\n✅ Import completed successfully")
-            sys.exit(0)
-        else:
-            print("\n❌ Import failed")
-            sys.exit(1)
-    
-    elif args.command == "import-sort":
-        success, stacks = import_and_sort(args.source, args.destination)
-        if success:
-            print(f"\n✅ Successfully created {len(stacks)} stacks")
-            sys.exit(0)
-        else:
-            print("\n❌ Import and sort failed")
-            sys.exit(1)
-    
-    elif args.command == "sort":
-        stacks = sort_only(args.directory)
-        if stacks:
-            print(f"\n✅ Successfully created {len(stacks)} stacks")
-            sys.exit(0)
-        else:
-            print("\n❌ No stacks created")
-            sys.exit(1)
-    
-    elif args.command == "stack":
-        if stack_only(args.directory):
-            print("\n✅ Stack processed successfully")
-            sys.exit(0)
-        else:
-            print("\n❌ Stack processing failed")
-            sys.exit(1)
-    
-    elif args.command == "sort-stack":
-        if sort_and_stack(args.directory):
-            print("\n✅ Sort and stack completed successfully")
-            sys.exit(0)
-        else:
-            print("\n❌ Sort and stack failed")
-            sys.exit(1)
-    
-    elif args.command == "auto":
-        if auto_process(args.source, args.destination):
-            print("\n✅ Automatic processing completed successfully")
-            sys.exit(0)
-        else:
-            print("\n❌ Automatic processing failed")
-            sys.exit(1)
-    
-    elif args.command == "config":
-        config_manager = ConfigManager()
+    if args.command == "config":
+        config_manager = get_config_manager()
         
         if args.set_import_destination:
             config_manager.set_default_destination(args.set_import_destination)
+            config_manager.flush()
             print(f"\n✅ Default import destination set to: {args.set_import_destination}")
         
         if args.show:
             config = config_manager.get_config()
             print("\nCurrent configuration:")
             print(f"Default import destination: {config.get('import', {}).get('default_destination', 'Not set')}")
-            print(f"Import threads: {config.get('import', {}).get('max_threads', 4)}")
+            print(f"Import threads: {config.get('import', {}).get('max_threads') or 'automatic'}")
             print(f"Skip existing files: {config.get('import', {}).get('skip_existing', True)}")
             print(f"Copy XMP files: {config.get('import', {}).get('copy_xmp_files', True)}")
             print(f"Stack interval: {config.get('sorter', {}).get('stack_interval', 1.0)} seconds")
@@ -312,13 +379,19 @@ and Helicon Focus functionality independently.
         
         sys.exit(0)
     
-    else:
+    command = COMMANDS.get(args.command)
+    if command is None:
         parser.print_help()
         sys.exit(1)
     
-    # Print total execution time
-    total_time = time.time() - total_start
-    print(f"\n⏱️ Total execution time: {total_time:.2f} seconds")
+    try:
+        success, message = command(args)
+        print(f"\n✅ {message}" if success else f"\n❌ {message}")
+    finally:
+        # Print total execution time (auch bei Abbruch oder Fehler)
+        total_time = (time.perf_counter_ns() - total_start) / 1e9
+        print(f"\n⏱️ Total execution time: {total_time:.2f} seconds")
+    sys.exit(0 if success else 1)
 
 
 if __name__ == "__main__":